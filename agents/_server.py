@@ -0,0 +1,116 @@
+"""
+Shared A2A server helpers
+
+- Builds the A2A Starlette application for any ADK agent.
+- Renders every JSON-RPC response with orjson instead of the stdlib json module.
+- Runs an agent app under Gunicorn with uvloop/httptools Uvicorn workers.
+"""
+
+import os
+from typing import Any, Dict
+
+import orjson
+from gunicorn.app.base import BaseApplication
+from starlette.responses import JSONResponse
+from uvicorn.workers import UvicornWorker
+
+from a2a.server.apps import A2AStarletteApplication
+from a2a.server.apps.jsonrpc import jsonrpc_app
+from a2a.server.request_handlers import DefaultRequestHandler
+from a2a.server.tasks import InMemoryTaskStore
+from a2a.types import AgentCard
+
+from google.adk.a2a.executor.a2a_agent_executor import A2aAgentExecutor, A2aAgentExecutorConfig
+from google.adk.agents import Agent
+from google.adk.artifacts import InMemoryArtifactService
+from google.adk.runners import Runner
+
+from agents._sessions import REDIS_URL, create_session_services
+
+
+class ORJSONResponse(JSONResponse):
+    """JSONResponse rendered with orjson."""
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+
+
+# A2AStarletteApplication has no response-class option; swap the class its
+# JSON-RPC app uses for agent cards and every RPC reply.
+jsonrpc_app.JSONResponse = ORJSONResponse
+
+
+# Runners keyed by agent name, so agents co-located in one process share them.
+_runners: Dict[str, Runner] = {}
+
+
+def _get_runner(agent: Agent) -> Runner:
+    if agent.name not in _runners:
+        session_service, memory_service = create_session_services()
+        _runners[agent.name] = Runner(
+            app_name=agent.name,
+            agent=agent,
+            artifact_service=InMemoryArtifactService(),
+            session_service=session_service,
+            memory_service=memory_service,
+        )
+    return _runners[agent.name]
+
+
+def create_agent_a2a_server(agent: Agent, agent_card: AgentCard):
+    """Create an A2A server for any ADK agent using the quickstart pattern."""
+    runner = _get_runner(agent)
+    config = A2aAgentExecutorConfig()
+    executor = A2aAgentExecutor(runner=runner, config=config)
+
+    request_handler = DefaultRequestHandler(
+        agent_executor=executor,
+        task_store=InMemoryTaskStore(),
+    )
+    return A2AStarletteApplication(agent_card=agent_card, http_handler=request_handler)
+
+
+class _UvloopWorker(UvicornWorker):
+    """Uvicorn worker pinned to uvloop + httptools, without per-request access logs."""
+
+    CONFIG_KWARGS = {"loop": "uvloop", "http": "httptools", "access_log": False}
+
+
+class _GunicornApplication(BaseApplication):
+    """Serve an ASGI app under Gunicorn with Uvicorn workers."""
+
+    def __init__(self, application, options):
+        self.application = application
+        self.options = options
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+
+    def load(self):
+        return self.application
+
+
+def agent_workers(env_var: str, default: int) -> int:
+    """Worker count from `env_var`, else `default` when REDIS_URL is set, else 1.
+
+    Without REDIS_URL every worker keeps its own in-memory sessions, and a
+    follow-up A2A call on the same context must reach the same process.
+    """
+    return int(os.getenv(env_var, default if REDIS_URL else 1))
+
+
+def run_agent(app, bind: str, workers: int):
+    """Serve a built agent app on `bind` (host:port or unix:path) with `workers` processes."""
+    if workers > 1 and not REDIS_URL:
+        raise SystemExit(
+            f"{workers} workers need shared sessions: set REDIS_URL or run a single worker."
+        )
+    _GunicornApplication(app, {
+        "bind": bind,
+        "workers": workers,
+        "worker_class": _UvloopWorker,
+        "keepalive": 30,
+        "loglevel": os.getenv("AGENT_LOG_LEVEL", "warning"),
+    }).run()
@@ -0,0 +1,182 @@
+"""
+Redis-backed ADK session and memory services
+
+- Lets every Gunicorn worker (and every host) see the same sessions.
+- Enabled by setting REDIS_URL; without it the agents keep ADK's in-memory services.
+"""
+
+import json
+import os
+import re
+import time
+import uuid
+from datetime import datetime
+from typing import Any, Optional, Tuple
+
+import redis.asyncio as redis
+
+from google.adk.events import Event
+from google.adk.memory import BaseMemoryService, InMemoryMemoryService
+from google.adk.memory.base_memory_service import SearchMemoryResponse
+from google.adk.memory.memory_entry import MemoryEntry
+from google.adk.sessions import BaseSessionService, InMemorySessionService, Session
+from google.adk.sessions.base_session_service import GetSessionConfig, ListSessionsResponse
+
+REDIS_URL = os.getenv("REDIS_URL")
+
+
+class RedisSessionService(BaseSessionService):
+    """ADK session service storing sessions in Redis.
+
+    Layout per session: a hash `session:{app}:{user}:{id}` holding the JSON
+    state and last update time, and a list `...:events` of JSON events. A set
+    `sessions:{app}:{user}` indexes the session IDs. 'app:'/'user:' scoped
+    state is kept with each session rather than shared across sessions.
+    """
+
+    def __init__(self, client: redis.Redis):
+        self._redis = client
+
+    @staticmethod
+    def _key(app_name: str, user_id: str, session_id: str) -> str:
+        return f"session:{app_name}:{user_id}:{session_id}"
+
+    @staticmethod
+    def _index_key(app_name: str, user_id: str) -> str:
+        return f"sessions:{app_name}:{user_id}"
+
+    async def create_session(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        state: Optional[dict[str, Any]] = None,
+        session_id: Optional[str] = None,
+    ) -> Session:
+        session_id = session_id.strip() if session_id and session_id.strip() else str(uuid.uuid4())
+        session = Session(
+            app_name=app_name,
+            user_id=user_id,
+            id=session_id,
+            state=state or {},
+            last_update_time=time.time(),
+        )
+        async with self._redis.pipeline(transaction=True) as pipe:
+            pipe.hset(
+                self._key(app_name, user_id, session_id),
+                mapping={"state": json.dumps(session.state), "last_update_time": session.last_update_time},
+            )
+            pipe.sadd(self._index_key(app_name, user_id), session_id)
+            await pipe.execute()
+        return session
+
+    async def get_session(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        session_id: str,
+        config: Optional[GetSessionConfig] = None,
+    ) -> Optional[Session]:
+        key = self._key(app_name, user_id, session_id)
+        meta = await self._redis.hgetall(key)
+        if not meta:
+            return None
+
+        # Only the tail is needed when the caller asks for recent events
+        start = 0
+        if config and config.num_recent_events and not config.after_timestamp:
+            start = -config.num_recent_events
+        events = [Event.model_validate_json(e) for e in await self._redis.lrange(f"{key}:events", start, -1)]
+        if config and config.after_timestamp:
+            events = [e for e in events if e.timestamp >= config.after_timestamp]
+            if config.num_recent_events:
+                events = events[-config.num_recent_events:]
+
+        return Session(
+            app_name=app_name,
+            user_id=user_id,
+            id=session_id,
+            state=json.loads(meta["state"]),
+            events=events,
+            last_update_time=float(meta["last_update_time"]),
+        )
+
+    async def list_sessions(self, *, app_name: str, user_id: str) -> ListSessionsResponse:
+        sessions = []
+        for session_id in await self._redis.smembers(self._index_key(app_name, user_id)):
+            meta = await self._redis.hgetall(self._key(app_name, user_id, session_id))
+            if meta:
+                sessions.append(Session(
+                    app_name=app_name,
+                    user_id=user_id,
+                    id=session_id,
+                    state=json.loads(meta["state"]),
+                    last_update_time=float(meta["last_update_time"]),
+                ))
+        return ListSessionsResponse(sessions=sessions)
+
+    async def delete_session(self, *, app_name: str, user_id: str, session_id: str) -> None:
+        key = self._key(app_name, user_id, session_id)
+        async with self._redis.pipeline(transaction=True) as pipe:
+            pipe.delete(key, f"{key}:events")
+            pipe.srem(self._index_key(app_name, user_id), session_id)
+            await pipe.execute()
+
+    async def append_event(self, session: Session, event: Event) -> Event:
+        event = await super().append_event(session=session, event=event)
+        if event.partial:
+            return event
+
+        session.last_update_time = event.timestamp
+        key = self._key(session.app_name, session.user_id, session.id)
+        async with self._redis.pipeline(transaction=True) as pipe:
+            pipe.rpush(f"{key}:events", event.model_dump_json(exclude_none=True))
+            pipe.hset(key, mapping={"state": json.dumps(session.state), "last_update_time": event.timestamp})
+            await pipe.execute()
+        return event
+
+
+class RedisMemoryService(BaseMemoryService):
+    """ADK memory service storing session transcripts in a Redis hash per user.
+
+    Search uses the same keyword matching as ADK's InMemoryMemoryService.
+    """
+
+    def __init__(self, client: redis.Redis):
+        self._redis = client
+
+    @staticmethod
+    def _key(app_name: str, user_id: str) -> str:
+        return f"memory:{app_name}:{user_id}"
+
+    async def add_session_to_memory(self, session: Session):
+        events = [
+            e.model_dump(mode="json", exclude_none=True)
+            for e in session.events
+            if e.content and e.content.parts
+        ]
+        await self._redis.hset(self._key(session.app_name, session.user_id), session.id, json.dumps(events))
+
+    async def search_memory(self, *, app_name: str, user_id: str, query: str) -> SearchMemoryResponse:
+        words_in_query = set(query.lower().split())
+        response = SearchMemoryResponse()
+        for stored in await self._redis.hvals(self._key(app_name, user_id)):
+            for data in json.loads(stored):
+                event = Event.model_validate(data)
+                text = " ".join(part.text for part in event.content.parts if part.text)
+                if words_in_query & set(re.findall(r"[A-Za-z]+", text.lower())):
+                    response.memories.append(MemoryEntry(
+                        content=event.content,
+                        author=event.author,
+                        timestamp=datetime.fromtimestamp(event.timestamp).isoformat(),
+                    ))
+        return response
+
+
+def create_session_services() -> Tuple[BaseSessionService, BaseMemoryService]:
+    """Return (session, memory) services: Redis when REDIS_URL is set, else in-memory."""
+    if not REDIS_URL:
+        return InMemorySessionService(), InMemoryMemoryService()
+    client = redis.from_url(REDIS_URL, decode_responses=True)
+    return RedisSessionService(client), RedisMemoryService(client)
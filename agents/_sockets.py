@@ -0,0 +1,9 @@
+"""
+Unix domain socket paths of the internal-only agents
+
+- Kept free of dependencies so the launcher can import them without loading the agent stack.
+- Their http://localhost URLs are logical addresses that clients route over these sockets.
+"""
+
+DATA_AGENT_SOCKET = "/tmp/a2a_customer_data_agent.sock"
+SUPPORT_AGENT_SOCKET = "/tmp/a2a_support_agent.sock"
@@ -7,29 +7,37 @@ Customer Data Agent
 """
 
 # agents/data_agent.py
+import contextlib
 import os
-import uvicorn
 from datetime import datetime
 from typing import Any
 import asyncio
-import nest_asyncio
 
 from google.adk.agents import Agent
-from google.adk.artifacts import InMemoryArtifactService
-from google.adk.memory.in_memory_memory_service import InMemoryMemoryService
-from google.adk.runners import Runner
-from google.adk.sessions import InMemorySessionService
-from a2a.server.apps import A2AStarletteApplication
-from a2a.server.request_handlers import DefaultRequestHandler
-from a2a.server.tasks import InMemoryTaskStore
 from a2a.types import AgentCapabilities, AgentCard, AgentSkill, TransportProtocol
-from a2a.a2a.executor.a2a_agent_executor import A2aAgentExecutor, A2aAgentExecutorConfig
-from mcp_server import get_customer, list_customers, update_customer, create_ticket, get_customer_history
+from agents._server import agent_workers, create_agent_a2a_server, run_agent
+from agents._sockets import DATA_AGENT_SOCKET
+from mcp_server import (
+    close_db, get_customer, list_customers, update_customer, create_ticket, create_tickets, get_customer_history,
+    get_customer_histories,
+)
 
 # Global Config (ensure these match your run_a2a_servers.py)
 DATA_AGENT_PORT = 11001
+DATA_AGENT_WORKERS = agent_workers("DATA_AGENT_WORKERS", os.cpu_count() or 1)
 DATA_AGENT_URL = f"http://localhost:{DATA_AGENT_PORT}"
 
+# Read tools are cached (and invalidated by the write tools) inside mcp_server.
+customer_db_tools = [
+    get_customer,
+    list_customers,
+    update_customer,
+    create_ticket,
+    create_tickets,
+    get_customer_history,
+    get_customer_histories,
+]
+
 
 data_agent = Agent(
     model="gemini-2.5-flash",
@@ -46,14 +54,16 @@ CRITICAL:
   - list_customers(status, limit)
   - update_customer(customer_id, data)
   - create_ticket(customer_id, issue, priority)
+  - create_tickets(tickets)  # several tickets in ONE call
   - get_customer_history(customer_id)
+  - get_customer_histories(customer_ids, ticket_status)  # many customers in ONE call
 
 Behavior:
 - For each request, decide which MCP tool(s) to call and call them explicitly.
 - Do NOT hallucinate data; always rely on tool results.
 - Reply with concise, structured JSON-like text so the Router or Support Agent can easily parse it.
 """,
-    tools=[customer_db_toolset],
+    tools=customer_db_tools,
 )
 
 data_agent_card = AgentCard(
@@ -68,17 +78,15 @@ data_agent_card = AgentCard(
     skills=[AgentSkill(id="customer_data_skill", name="Customer Data Operations", description="Fetches and updates customer and ticket data", tags=["customer", "tickets", "database"])],
 )
 
-def create_agent_a2a_server(agent: Agent, agent_card: AgentCard):
-    runner = Runner(
-        app_name=agent.name, agent=agent, 
-        artifact_service=InMemoryArtifactService(), session_service=InMemorySessionService(), 
-        memory_service=InMemoryMemoryService()
-    )
-    executor = A2aAgentExecutor(runner=runner, config=A2aAgentExecutorConfig())
-    request_handler = DefaultRequestHandler(agent_executor=executor, task_store=InMemoryTaskStore())
-    return A2AStarletteApplication(agent_card=agent_card, http_handler=request_handler)
+
+@contextlib.asynccontextmanager
+async def _lifespan(app):
+    yield
+    # The tools run in-process; close their DB connections so the worker can exit
+    await close_db()
+
+
+app = create_agent_a2a_server(data_agent, data_agent_card).build(lifespan=_lifespan)
 
 if __name__ == "__main__":
-    nest_asyncio.apply()
-    app = create_agent_a2a_server(data_agent, data_agent_card)
-    uvicorn.run(app.build(), host='0.0.0.0', port=DATA_AGENT_PORT, log_level='info')
+    run_agent(app, bind=f"unix:{DATA_AGENT_SOCKET}", workers=DATA_AGENT_WORKERS)
@@ -7,45 +7,55 @@ Router (Host) Agent
 """
 
 import asyncio
+import contextlib
 import logging
 import os
 import threading
 import time
 from typing import Any
-import uvicorn
-import nest_asyncio
+import httpx
 
-from a2a.server.apps import A2AStarletteApplication
-from a2a.server.request_handlers import DefaultRequestHandler
-from a2a.server.tasks import InMemoryTaskStore
 from a2a.types import AgentCapabilities, AgentCard, AgentSkill, TransportProtocol
 from a2a.utils.constants import AGENT_CARD_WELL_KNOWN_PATH
 
-from google.adk.a2a.executor.a2a_agent_executor import A2aAgentExecutor, A2aAgentExecutorConfig
 from google.adk.agents import Agent
 from google.adk.agents.remote_a2a_agent import RemoteA2aAgent
-from google.adk.artifacts import InMemoryArtifactService
-from google.adk.memory.in_memory_memory_service import InMemoryMemoryService
-from google.adk.runners import Runner
-from google.adk.sessions import InMemorySessionService
+
+from agents._server import agent_workers, create_agent_a2a_server, run_agent
+from agents._sockets import DATA_AGENT_SOCKET, SUPPORT_AGENT_SOCKET
 
 # --- Configuration (Must match other agents) ---
 ROUTER_AGENT_PORT = 11000
+ROUTER_AGENT_WORKERS = agent_workers("ROUTER_AGENT_WORKERS", os.cpu_count() or 1)
 DATA_AGENT_URL = "http://localhost:11001"
 SUPPORT_AGENT_URL = "http://localhost:11002"
 ROUTER_AGENT_URL = f"http://localhost:{ROUTER_AGENT_PORT}"
 
+# --- Shared A2A HTTP Client ---
+# One pooled client for every hop to the downstream agents, so repeated calls
+# reuse keep-alive connections. Each logical URL is mounted on its socket.
+_A2A_LIMITS = httpx.Limits(max_keepalive_connections=64, max_connections=128)
+_A2A_CLIENT = httpx.AsyncClient(
+    mounts={
+        DATA_AGENT_URL: httpx.AsyncHTTPTransport(uds=DATA_AGENT_SOCKET, limits=_A2A_LIMITS),
+        SUPPORT_AGENT_URL: httpx.AsyncHTTPTransport(uds=SUPPORT_AGENT_SOCKET, limits=_A2A_LIMITS),
+    },
+    timeout=httpx.Timeout(600.0, connect=5.0),
+)
+
 # --- Remote Agent Definitions ---
 remote_data_agent = RemoteA2aAgent(
     name="customer_data", 
     description="Tool to get customer profiles, lists of IDs, ticket history, and update records via MCP. USE THIS FOR ALL DATA ACCESS.",
     agent_card=f"{DATA_AGENT_URL}{AGENT_CARD_WELL_KNOWN_PATH}",
+    httpx_client=_A2A_CLIENT,
 )
 
 remote_support_agent = RemoteA2aAgent(
     name="customer_support", 
     description="Tool to generate the final, polite, customer-facing response based on the context provided.",
     agent_card=f"{SUPPORT_AGENT_URL}{AGENT_CARD_WELL_KNOWN_PATH}",
+    httpx_client=_A2A_CLIENT,
 )
 
 # --- Router Agent Definition ---
@@ -54,26 +64,16 @@ router_host_agent = Agent(
     name="router_host_agent",
     sub_agents=[remote_data_agent, remote_support_agent], 
     
-    instruction="""
-    You are the Router Host Agent (Orchestrator). Your role is coordination.
+    # Static text only: an identical prefix every turn keeps it cacheable by the model.
+    instruction="""You are the Router Host Agent. You coordinate; never answer the customer yourself or output raw JSON.
 
-    **CRITICAL OUTPUT RULE:** Your ONLY goal is to call the 'customer_support' tool as the final action. You MUST NOT output JSON or raw tool output yourself.
+Tools: 'customer_data' (all data reads and writes) and 'transfer_to_agent' (hands off to 'customer_support').
 
-    **TOOL NAMING RULE:** You have two agents: 'customer_data' and 'transfer_to_agent'. The 'customer_support' agent is called via 'transfer_to_agent'.
-
-    **COORDINATION FLOWS:**
-    
-    1. **Data Fetch & Multi-Intent (MANDATORY CHAIN):**
-       * Step 1: Call 'customer_data' to gather facts (e.g., fetch, update, get history).
-       * Step 2: Synthesize the raw JSON into concise, actionable TEXT.
-       * Step 3 (FINAL ACTION): CALL 'transfer_to_agent' with the synthesized TEXT summary and the original query.
-
-    2. **COMPLEX DECOMPOSITION (Mandatory Chain for Test 3):**
-       When a complex report is required, you MUST follow these chained steps and NEVER claim it's impossible:
-       * **Step A:** Call 'customer_data' (list_customers) to get ALL required customer IDs.
-       * **Step B:** Execute sequential calls to 'customer_data' (get_customer_history) for each ID. You MUST perform the final filtering (e.g., status 'open') yourself.
-       * **Step C (FINAL ACTION):** Compile the final report and CALL 'transfer_to_agent'.
-    """,
+1. Call 'customer_data' for the facts you need (fetch, update, history, new tickets).
+   Reports over many customers: list_customers for the IDs, then get_customer_histories ONCE with all IDs (ticket_status='open' when only open tickets matter). Never claim this is impossible.
+2. Summarize the results as short plain TEXT.
+3. FINAL ACTION: call 'transfer_to_agent' to 'customer_support' with the summary and the original query.
+""",
 )
 
 router_agent_card = AgentCard(
@@ -95,27 +95,28 @@ router_agent_card = AgentCard(
     ],
 )
 
-# --- Server Utilities ---
-def create_agent_a2a_server(agent: Agent, agent_card: AgentCard):
-    """Create an A2A server for any ADK agent using the quickstart pattern."""
-    runner = Runner(
-        app_name=agent.name,
-        agent=agent,
-        artifact_service=InMemoryArtifactService(),
-        session_service=InMemorySessionService(),
-        memory_service=InMemoryMemoryService(),
-    )
-    config = A2aAgentExecutorConfig()
-    executor = A2aAgentExecutor(runner=runner, config=config)
-
-    request_handler = DefaultRequestHandler(
-        agent_executor=executor,
-        task_store=InMemoryTaskStore(),
-    )
-    return A2AStarletteApplication(agent_card=agent_card, http_handler=request_handler)
 
+logger = logging.getLogger(__name__)
+
+
+async def _prewarm(url: str) -> None:
+    """Fetch a downstream agent card so its pooled connection is open before the first request."""
+    try:
+        response = await _A2A_CLIENT.get(f"{url}{AGENT_CARD_WELL_KNOWN_PATH}")
+        response.raise_for_status()
+    except httpx.HTTPError as e:
+        logger.warning("Could not pre-warm %s: %s", url, e)
+
+
+@contextlib.asynccontextmanager
+async def _lifespan(app):
+    # Runs in each worker after fork, so every worker warms its own pool
+    await asyncio.gather(_prewarm(DATA_AGENT_URL), _prewarm(SUPPORT_AGENT_URL))
+    yield
+    await _A2A_CLIENT.aclose()
+
+
+app = create_agent_a2a_server(router_host_agent, router_agent_card).build(lifespan=_lifespan)
 
 if __name__ == "__main__":
-    nest_asyncio.apply()
-    app = create_agent_a2a_server(router_host_agent, router_agent_card)
-    uvicorn.run(app.build(), host='0.0.0.0', port=ROUTER_AGENT_PORT, log_level='info')
\ No newline at end of file
+    run_agent(app, bind=f"0.0.0.0:{ROUTER_AGENT_PORT}", workers=ROUTER_AGENT_WORKERS)
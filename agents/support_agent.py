@@ -11,24 +11,18 @@ import os
 import threading
 import time
 from typing import Any
-import uvicorn
-import nest_asyncio
 
-from a2a.server.apps import A2AStarletteApplication
-from a2a.server.request_handlers import DefaultRequestHandler
-from a2a.server.tasks import InMemoryTaskStore
 from a2a.types import AgentCapabilities, AgentCard, AgentSkill, TransportProtocol
 from a2a.utils.constants import AGENT_CARD_WELL_KNOWN_PATH
 
-from google.adk.a2a.executor.a2a_agent_executor import A2aAgentExecutor, A2aAgentExecutorConfig
 from google.adk.agents import Agent
-from google.adk.artifacts import InMemoryArtifactService
-from google.adk.memory.in_memory_memory_service import InMemoryMemoryService
-from google.adk.runners import Runner
-from google.adk.sessions import InMemorySessionService
+
+from agents._server import agent_workers, create_agent_a2a_server, run_agent
+from agents._sockets import SUPPORT_AGENT_SOCKET
 
 # --- Configuration ---
 SUPPORT_AGENT_PORT = 11002
+SUPPORT_AGENT_WORKERS = agent_workers("SUPPORT_AGENT_WORKERS", max(1, (os.cpu_count() or 1) // 2))
 SUPPORT_AGENT_URL = f"http://localhost:{SUPPORT_AGENT_PORT}"
 
 # --- Agent Definition ---
@@ -64,27 +58,8 @@ support_agent_card = AgentCard(
     ],
 )
 
-# --- Server Utilities ---
-def create_agent_a2a_server(agent: Agent, agent_card: AgentCard):
-    """Create an A2A server for any ADK agent using the quickstart pattern."""
-    runner = Runner(
-        app_name=agent.name,
-        agent=agent,
-        artifact_service=InMemoryArtifactService(),
-        session_service=InMemorySessionService(),
-        memory_service=InMemoryMemoryService(),
-    )
-    config = A2aAgentExecutorConfig()
-    executor = A2aAgentExecutor(runner=runner, config=config)
-
-    request_handler = DefaultRequestHandler(
-        agent_executor=executor,
-        task_store=InMemoryTaskStore(),
-    )
-    return A2AStarletteApplication(agent_card=agent_card, http_handler=request_handler)
 
+app = create_agent_a2a_server(support_agent, support_agent_card).build()
 
 if __name__ == "__main__":
-    nest_asyncio.apply()
-    app = create_agent_a2a_server(support_agent, support_agent_card)
-    uvicorn.run(app.build(), host='0.0.0.0', port=SUPPORT_AGENT_PORT, log_level='info')
\ No newline at end of file
+    run_agent(app, bind=f"unix:{SUPPORT_AGENT_SOCKET}", workers=SUPPORT_AGENT_WORKERS)
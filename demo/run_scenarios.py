@@ -5,8 +5,8 @@ Assumes:
 - MCP server is running on http://localhost:8000/mcp (for DB tools).
 - A2A agents are running:
     Router Host Agent    -> http://localhost:11000
-    Customer Data Agent  -> http://localhost:11001
-    Support Agent        -> http://localhost:11002
+    Customer Data Agent  -> unix:/tmp/a2a_customer_data_agent.sock
+    Support Agent        -> unix:/tmp/a2a_support_agent.sock
 """
 
 # run_scenarios.py
@@ -14,12 +14,16 @@ import asyncio
 import logging
 import os
 import sys
-from typing import Any
+from contextlib import aclosing
+from typing import Any, AsyncIterator
 
 # Import client components
 import httpx
+from aiolimiter import AsyncLimiter
 from a2a.client.client_factory import ClientFactory, ClientConfig
-from a2a.types import TransportProtocol, AgentCard
+from a2a.types import (
+    TransportProtocol, AgentCard, Message, Part, Role, TaskArtifactUpdateEvent, TaskStatusUpdateEvent, TextPart,
+)
 from a2a.client import create_text_message_object
 from a2a.utils.constants import AGENT_CARD_WELL_KNOWN_PATH
 
@@ -28,6 +32,9 @@ ROUTER_AGENT_URL = "http://localhost:11000"
 # Add other necessary constants defined in Cell 4
 DATA_AGENT_URL = "http://localhost:11001"
 SUPPORT_AGENT_URL = "http://localhost:11002"
+# Demo pacing: scenarios in flight at once (1 streams each reply), and seconds between scenario starts
+SCENARIO_CONCURRENCY = 2
+SCENARIO_RATE_PERIOD = 30
 
 
 # --- A2A Simple Client (Final Working Version) ---
@@ -35,8 +42,12 @@ class A2ASimpleClient:
     """A minimal client to send text requests to the A2A Router."""
 
     def __init__(self):
-        # Initialize Async Client
-        self._async_client = httpx.AsyncClient(timeout=60.0)
+        # Initialize Async Client: one keep-alive pool reused by every scenario
+        self._async_client = httpx.AsyncClient(
+            http2=True,
+            timeout=httpx.Timeout(60.0),
+            limits=httpx.Limits(max_keepalive_connections=32, max_connections=64, keepalive_expiry=60.0),
+        )
         
         # 1. Create ClientConfig instance
         config = ClientConfig(
@@ -52,133 +63,169 @@ class A2ASimpleClient:
         self._client_factory = ClientFactory(config)
         self._resolver = None 
 
+        # 3. A2A clients per agent base URL; agent cards are static while an agent runs
+        self._client_cache: dict[str, Any] = {}
+        self._cache_lock = asyncio.Lock()
+
+    async def __aenter__(self) -> "A2ASimpleClient":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        # Release pooled sockets cleanly
+        await self._async_client.aclose()
+
     async def _get_client(self, agent_base_url: str) -> Any:
-        card_url = f"{agent_base_url}{AGENT_CARD_WELL_KNOWN_PATH}"
-        
-        # FIX: Manually fetch the card data to bypass unstable resolver methods
-        response = await self._async_client.get(card_url)
-        response.raise_for_status() 
-        
-        # Deserialize the JSON response into the required AgentCard object
-        card_data = response.json()
-        card = AgentCard(**card_data)
+        # Fast path: no lock once the client is cached
+        client = self._client_cache.get(agent_base_url)
+        if client is not None:
+            return client
+
+        async with self._cache_lock:
+            # Another coroutine may have built it while we waited
+            client = self._client_cache.get(agent_base_url)
+            if client is not None:
+                return client
+
+            card_url = f"{agent_base_url}{AGENT_CARD_WELL_KNOWN_PATH}"
+            
+            # FIX: Manually fetch the card data to bypass unstable resolver methods
+            response = await self._async_client.get(card_url)
+            response.raise_for_status() 
+            
+            # Validate the card once, straight from the response bytes; the
+            # client built from it is cached, so this never runs again per URL
+            card = AgentCard.model_validate_json(response.content)
 
-        # FIX: Use the correct method name 'create'
-        client = self._client_factory.create(card) 
-        return client
+            # FIX: Use the correct method name 'create'
+            client = self._client_factory.create(card) 
+            self._client_cache[agent_base_url] = client
+            return client
 
     async def create_task(self, agent_base_url: str, text: str) -> str:
-        """Sends the message and extracts the final text response."""
+        """Sends the message and returns the text of the first frame carrying a result."""
         client = await self._get_client(agent_base_url)
         message_obj = create_text_message_object(content=text)
         
-        responses = []
-        # Note: The 'await' block in the loop is essential for streaming
-        async for response in client.send_message(message_obj):
-            responses.append(response)
-
-        # Extract final text, robustly handling failed tasks
-        if responses and responses[0] is not None and isinstance(responses[0], tuple) and len(responses[0]) > 0:
-            task = responses[0][0]
-            
-            if task is None or not getattr(task, 'artifacts', None):
-                 return f"Task failed or returned empty: {str(task)}"
-
-            try:
-                # Success path
-                return task.artifacts[0].parts[0].root.text
-            except (AttributeError, IndexError, TypeError):
-                # Fallback for unexpected structure (e.g., if LLM outputs only JSON code block)
-                return f"Task completed, but output structure failed. Raw Task: {str(task)}"
-                
+        task = None
+        # Stop at the first result frame instead of draining the whole stream
+        async with aclosing(client.send_message(message_obj)) as frames:
+            async for response in frames:
+                if isinstance(response, Message):
+                    return _parts_text(response.parts)
+
+                task = response[0]
+                if task is not None and getattr(task, 'artifacts', None):
+                    try:
+                        # Success path
+                        return task.artifacts[0].parts[0].root.text
+                    except (AttributeError, IndexError, TypeError):
+                        # Fallback for unexpected structure (e.g., if LLM outputs only JSON code block)
+                        return f"Task completed, but output structure failed. Raw Task: {str(task)}"
+
+        if task is not None:
+            return f"Task failed or returned empty: {str(task)}"
         return 'No response received'
 
-a2a_client = A2ASimpleClient()
-
+    async def stream_task(self, agent_base_url: str, text: str) -> AsyncIterator[str]:
+        """Sends the message and yields response text as each frame arrives."""
+        client = await self._get_client(agent_base_url)
+        message_obj = create_text_message_object(content=text)
 
-# --- Scenario Execution Functions ---
+        last_text = None
+        async with aclosing(client.send_message(message_obj)) as frames:
+            async for response in frames:
+                if isinstance(response, Message):
+                    yield _parts_text(response.parts)
+                    continue
+
+                task, update = response
+                if isinstance(update, TaskStatusUpdateEvent):
+                    # ADK reports each intermediate agent reply as a status message;
+                    # the initial 'submitted' update echoes the user's request
+                    message = update.status.message
+                    if message and message.role == Role.agent:
+                        text = _parts_text(message.parts)
+                        if text:
+                            last_text = text
+                            yield text
+                elif isinstance(update, TaskArtifactUpdateEvent):
+                    # The final artifact repeats the last status message
+                    text = _parts_text(update.artifact.parts)
+                    if text and text != last_text:
+                        yield text
+                elif update is None and task is not None:
+                    # Non-streaming agents answer with the completed task only
+                    for artifact in task.artifacts or []:
+                        yield _parts_text(artifact.parts)
+
+
+def _parts_text(parts: list[Part]) -> str:
+    return "".join(part.root.text for part in parts if isinstance(part.root, TextPart))
+
+# --- Scenarios: (title, query) ---
+SCENARIOS = [
+    ("TEST 1: Simple Query (ID 5 Fetch)",
+     "Get customer information for ID 5"),
+    ("TEST 2: Coordinated Query (Upgrade Request)",
+     "I'm customer 1 and need help upgrading my account"),
+    ("TEST 3: Complex Aggregation (Open Tickets for Active Customers)",
+     "Show me all active customers who have open tickets"),
+    ("TEST 4: Escalation (High Priority Ticket Creation)",
+     "I'm customer 2 and I've been charged twice, please refund immediately!"),
+    ("TEST 5: Multi-Intent (Update Email + Show History)",
+     "Update my email to alice.new@corp.com for customer 4 and show my ticket history"),
+]
+
+
+async def run_scenario(a2a_client: A2ASimpleClient, title: str, query: str) -> None:
+    header = (
+        "\n" + "="*80 + "\n"
+        f"=== {title} ===\n"
+        "================================================================================\n\n"
+        f"QUERY: {query}\n"
+    )
+    if SCENARIO_CONCURRENCY == 1:
+        # Nothing else is printing, so show the router's replies as they arrive
+        print(header + "\n--- Router Streamed Response ---")
+        async for text in a2a_client.stream_task(ROUTER_AGENT_URL, query):
+            print(text, flush=True)
+        print("--------------------------------\n")
+        return
 
-async def scenario_simple_query() -> None:
-    print("\n" + "="*80)
-    print("=== TEST 1: Simple Query (ID 5 Fetch) ===")
-    print("================================================================================\n")
-    query = "Get customer information for ID 5"
-    print(f"QUERY: {query}")
-    response = await a2a_client.create_task(ROUTER_AGENT_URL, query)
-    print("\n--- Router Final Response ---")
-    print(response)
-    print("-----------------------------\n")
-
-async def scenario_coordinated_query() -> None:
-    print("\n" + "="*80)
-    print("=== TEST 2: Coordinated Query (Upgrade Request) ===")
-    print("================================================================================\n")
-    query = "I'm customer 1 and need help upgrading my account"
-    print(f"QUERY: {query}")
-    response = await a2a_client.create_task(ROUTER_AGENT_URL, query)
-    print("\n--- Router Final Response ---")
-    print(response)
-    print("-----------------------------\n")
-
-async def scenario_complex_aggregation() -> None:
-    print("\n" + "="*80)
-    print("=== TEST 3: Complex Aggregation (Open Tickets for Active Customers) ===")
-    print("================================================================================\n")
-    query = "Show me all active customers who have open tickets"
-    print(f"QUERY: {query}")
     response = await a2a_client.create_task(ROUTER_AGENT_URL, query)
-    print("\n--- Router Final Response ---")
-    print(response)
-    print("-----------------------------\n")
-
-async def scenario_escalation() -> None:
-    print("\n" + "="*80)
-    print("=== TEST 4: Escalation (High Priority Ticket Creation) ===")
-    print("================================================================================\n")
-    query = "I'm customer 2 and I've been charged twice, please refund immediately!"
-    print(f"QUERY: {query}")
-    response = await a2a_client.create_task(ROUTER_AGENT_URL, query)
-    print("\n--- Router Final Response ---")
-    print(response)
-    print("-----------------------------\n")
-
-async def scenario_multi_intent() -> None:
-    print("\n" + "="*80)
-    print("=== TEST 5: Multi-Intent (Update Email + Show History) ===")
-    print("================================================================================\n")
-    query = "Update my email to alice.new@corp.com for customer 4 and show my ticket history"
-    print(f"QUERY: {query}")
-    response = await a2a_client.create_task(ROUTER_AGENT_URL, query)
-    print("\n--- Router Final Response ---")
-    print(response)
-    print("-----------------------------\n")
+    # One print per scenario so concurrent scenarios don't interleave their output
+    print(
+        header +
+        "\n--- Router Final Response ---\n"
+        f"{response}\n"
+        "-----------------------------\n"
+    )
 
 
 async def main():
-    """Runs all scenarios with delays to respect API quotas."""
+    """Runs all scenarios concurrently, rate limited to respect API quotas."""
     
     print("\n--- Starting all scenarios ---")
     
-    await scenario_simple_query()
-    print("--- Waiting 30 seconds for quota reset... ---")
-    await asyncio.sleep(30)
-    
-    await scenario_coordinated_query()
-    print("--- Waiting 30 seconds for quota reset... ---")
-    await asyncio.sleep(30)
+    # At most 2 scenarios in flight, and at most one new scenario per 30 seconds
+    semaphore = asyncio.Semaphore(SCENARIO_CONCURRENCY)
+    limiter = AsyncLimiter(max_rate=1, time_period=SCENARIO_RATE_PERIOD)
 
-    await scenario_complex_aggregation()
-    print("--- Waiting 30 seconds for quota reset... ---")
-    await asyncio.sleep(30)
+    async def run(a2a_client: A2ASimpleClient, title: str, query: str) -> None:
+        async with semaphore, limiter:
+            await run_scenario(a2a_client, title, query)
 
-    await scenario_escalation()
-    print("--- Waiting 30 seconds for quota reset... ---")
-    await asyncio.sleep(30)
+    async with A2ASimpleClient() as a2a_client:
+        await asyncio.gather(*(run(a2a_client, title, query) for title, query in SCENARIOS))
 
-    await scenario_multi_intent()
     print("\n--- All Scenarios Complete ---")
 
 if __name__ == "__main__":
+    # uvloop (libuv) is faster at socket I/O than the default loop; POSIX only
+    if sys.platform != "win32":
+        import uvloop
+        uvloop.install()
+
     # The client must be run in an event loop
     try:
         asyncio.run(main())
@@ -187,6 +234,8 @@ if __name__ == "__main__":
             # This handles the "cannot run an event loop" error common in environments 
             # where the loop is already running (like Colab or jupyter)
             import nest_asyncio
+            # nest_asyncio cannot patch uvloop loops; go back to the default policy
+            asyncio.set_event_loop_policy(None)
             nest_asyncio.apply()
             asyncio.run(main())
         else:
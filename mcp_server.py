@@ -1,10 +1,19 @@
 # mcp_server.py  —— FastMCP HTTP ver customer/ticket MCP server
 
-import sqlite3
-from datetime import datetime
-from typing import Any, Dict, List
-
+import asyncio
+import functools
+import inspect
+import sys
+import time
+from contextlib import asynccontextmanager
+from itertools import chain, combinations
+from typing import Any, AsyncIterator, Dict, List, Literal, Optional
+
+import aiosqlite
+import orjson
+from cachetools import TTLCache
 from mcp.server.fastmcp import FastMCP
+from pydantic import BaseModel, Field, TypeAdapter, ValidationError
 
 DB_PATH = "support.db"
 
@@ -15,150 +24,472 @@ mcp = FastMCP(
 )
 
 
-def _connect() -> sqlite3.Connection:
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
+_PRAGMAS = """
+PRAGMA journal_mode = WAL;
+PRAGMA synchronous = NORMAL;
+PRAGMA temp_store = MEMORY;
+PRAGMA mmap_size = 268435456;
+PRAGMA cache_size = -65536;
+"""
+
+# Indexes for the tools' hot predicates, also created by database_setup.py;
+# IF NOT EXISTS makes this a no-op on an up-to-date database.
+_INDEXES = """
+CREATE INDEX IF NOT EXISTS idx_customers_status_created ON customers(status, created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_tickets_customer_created ON tickets(customer_id, created_at DESC);
+"""
+
+# Connections are opened on first use (not at import, so forked workers never
+# share them). Each aiosqlite connection runs its queries on its own thread
+# and the tools await them, so the event loop never blocks and the DB work
+# never competes for the default executor: one writer plus _READERS readers
+# means exactly that many DB threads. WAL lets the readers run alongside the
+# writer. Autocommit mode; multi-statement writes open their own transaction.
+_READERS = 3
+
+_connections: List[aiosqlite.Connection] = []
+_writer: Optional[aiosqlite.Connection] = None
+_write_lock = asyncio.Lock()
+_readers: Optional["asyncio.Queue[aiosqlite.Connection]"] = None
+_readers_lock = asyncio.Lock()
+
+
+async def _open(query_only: bool) -> aiosqlite.Connection:
+    conn = await aiosqlite.connect(DB_PATH, isolation_level=None, cached_statements=256)
+    _connections.append(conn)
+    conn.row_factory = aiosqlite.Row
+    await conn.executescript(_PRAGMAS)
+    await conn.executescript(_INDEXES)
+    if query_only:
+        await conn.execute("PRAGMA query_only = ON")
     return conn
 
 
-def _row_to_dict(row: sqlite3.Row) -> Dict[str, Any]:
-    return {k: row[k] for k in row.keys()}
+async def close_db() -> None:
+    """Close every open DB connection.
+
+    aiosqlite's worker threads are not daemons, so any process that has used
+    the tools must call this before exiting or it hangs at shutdown.
+    """
+    global _writer, _readers
+    while _connections:
+        await _connections.pop().close()
+    _writer = None
+    _readers = None
+
+
+@asynccontextmanager
+async def _write_db() -> AsyncIterator[aiosqlite.Connection]:
+    """Hold the single writer connection for the duration of a write tool."""
+    global _writer
+    async with _write_lock:
+        if _writer is None:
+            _writer = await _open(query_only=False)
+        try:
+            yield _writer
+        finally:
+            # Never leave a failed transaction open on the shared connection
+            if _writer.in_transaction:
+                await _writer.rollback()
+
+
+@asynccontextmanager
+async def _read_db() -> AsyncIterator[aiosqlite.Connection]:
+    """Borrow a reader connection, waiting if all of them are busy."""
+    global _readers
+    if _readers is None:
+        async with _readers_lock:
+            if _readers is None:
+                pool: "asyncio.Queue[aiosqlite.Connection]" = asyncio.Queue()
+                for _ in range(_READERS):
+                    pool.put_nowait(await _open(query_only=True))
+                _readers = pool
+    conn = await _readers.get()
+    try:
+        yield conn
+    finally:
+        _readers.put_nowait(conn)
+
+
+def _now_iso() -> str:
+    """Current UTC time as ISO-8601 with microseconds, without building a datetime."""
+    secs, frac = divmod(time.time_ns(), 1_000_000_000)
+    return time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(secs)) + f".{frac // 1000:06d}"
+
+
+_CUSTOMER_COLUMNS = ("id", "name", "email", "phone", "status", "created_at", "updated_at")
+
+# Rows pulled from SQLite per fetchmany() call when building result lists
+_FETCH_BATCH = 256
+
+
+async def _fetch_dicts(cur: aiosqlite.Cursor) -> List[Dict[str, Any]]:
+    """Read all remaining rows as dicts, one bounded batch at a time."""
+    cols = [d[0] for d in cur.description]
+    out: List[Dict[str, Any]] = []
+    while rows := await cur.fetchmany(_FETCH_BATCH):
+        out.extend(dict(zip(cols, r)) for r in rows)
+    return out
+
+
+# --- Read cache ---
+# Read tool results keyed on (tool name, customer_id, JSON args); customer_id
+# is None for tools spanning customers. Writes drop the entries they may have
+# made stale. Each server process keeps its own cache, so a short TTL bounds
+# how long another process's write can go unseen. Only touched on the event
+# loop thread, so no lock is needed.
+_read_cache = TTLCache(maxsize=1024, ttl=5)
+
+# Write generations: a read only caches its result if no write it could have
+# missed finished while it ran, so a pre-write result is never stored after
+# the write's invalidation. _write_gen counts every write, _clear_gen the
+# writes that clear the whole cache, _customer_gen the writes per customer.
+_write_gen = 0
+_clear_gen = 0
+_customer_gen: Dict[Any, int] = {}
+
+
+def _read_generation(customer_id: Any) -> Any:
+    if customer_id is None:
+        return _write_gen
+    return _clear_gen, _customer_gen.get(customer_id, 0)
+
+
+def _cached_read(tool):
+    """Serve repeated read tool calls from _read_cache."""
+    signature = inspect.signature(tool)
+
+    @functools.wraps(tool)
+    async def wrapper(*args, **kwargs):
+        bound = signature.bind(*args, **kwargs)
+        bound.apply_defaults()
+        key = (
+            tool.__name__,
+            bound.arguments.get("customer_id"),
+            orjson.dumps(bound.arguments, option=orjson.OPT_SORT_KEYS),
+        )
+        if key in _read_cache:
+            return _read_cache[key]
+        generation = _read_generation(key[1])
+        result = await tool(*args, **kwargs)
+        if _read_generation(key[1]) == generation:
+            _read_cache[key] = result
+        return result
+
+    return wrapper
+
+
+def _invalidating_write(tool):
+    """Drop cached reads that a write to `customer_id` may have made stale.
+
+    Writes without a single customer_id (e.g. create_tickets) clear the cache.
+    """
+    signature = inspect.signature(tool)
+
+    @functools.wraps(tool)
+    async def wrapper(*args, **kwargs):
+        global _write_gen, _clear_gen
+        customer_id = signature.bind(*args, **kwargs).arguments.get("customer_id")
+        try:
+            return await tool(*args, **kwargs)
+        finally:
+            _write_gen += 1
+            if customer_id is None:
+                _clear_gen += 1
+                _read_cache.clear()
+            else:
+                _customer_gen[customer_id] = _customer_gen.get(customer_id, 0) + 1
+                for key in list(_read_cache.keys()):
+                    if key[1] is None or key[1] == customer_id:
+                        _read_cache.pop(key, None)
+
+    return wrapper
 
 
 @mcp.tool()
-def get_customer(customer_id: int) -> Dict[str, Any]:
+@_cached_read
+async def get_customer(customer_id: int) -> Dict[str, Any]:
     """Return a single customer record by ID."""
-    with _connect() as conn:
-        row = conn.execute(
+    async with _read_db() as conn:
+        async with conn.execute(
             "SELECT * FROM customers WHERE id = ?",
             (customer_id,),
-        ).fetchone()
+        ) as cur:
+            row = await cur.fetchone()
 
     if row is None:
         return {"found": False, "customer": None}
 
-    return {"found": True, "customer": _row_to_dict(row)}
+    return {"found": True, "customer": dict(row)}
 
 
 @mcp.tool()
-def list_customers(status: str = "active", limit: int = 20) -> Dict[str, Any]:
+@_cached_read
+async def list_customers(status: str = "active", limit: int = 20) -> Dict[str, Any]:
     """List customers filtered by status (active/disabled)."""
-    with _connect() as conn:
-        rows = conn.execute(
+    async with _read_db() as conn:
+        async with conn.execute(
             """
-            SELECT * FROM customers
+            SELECT id, name, email, phone, status, created_at, updated_at
+            FROM customers
             WHERE status = ?
             ORDER BY created_at DESC
             LIMIT ?
             """,
             (status, limit),
-        ).fetchall()
+        ) as cur:
+            customers = await _fetch_dicts(cur)
 
     return {
         "status": status,
-        "count": len(rows),
-        "customers": [_row_to_dict(r) for r in rows],
+        "count": len(customers),
+        "customers": customers,
     }
 
 
+_UPDATABLE_FIELDS = ("email", "name", "phone", "status")
+
+# One fixed UPDATE per non-empty subset of the updatable fields (15 in all),
+# so each shape is prepared once and then reused from the statement cache.
+# updated_at uses CURRENT_TIMESTAMP, the value the update_customer_timestamp
+# trigger stores, so the RETURNING row matches what is on disk.
+_UPDATE_TEMPLATES: Dict[tuple, str] = {
+    combo: (
+        f"UPDATE customers SET {', '.join(f'{col} = ?' for col in combo)}, "
+        "updated_at = CURRENT_TIMESTAMP WHERE id = ? RETURNING *"
+    )
+    for combo in chain.from_iterable(
+        combinations(_UPDATABLE_FIELDS, r) for r in range(1, len(_UPDATABLE_FIELDS) + 1)
+    )
+}
+
+
 @mcp.tool()
-def update_customer(customer_id: int, data: Dict[str, Any]) -> Dict[str, Any]:
+@_invalidating_write
+async def update_customer(customer_id: int, data: Dict[str, Any]) -> Dict[str, Any]:
     """Update basic customer fields like name/email/phone/status."""
     if not data:
         return {"ok": False, "message": "No fields to update."}
 
-    allowed = {"name", "email", "phone", "status"}
-    updates = {k: v for k, v in data.items() if k in allowed}
-    if not updates:
+    columns = tuple(col for col in _UPDATABLE_FIELDS if col in data)
+    if not columns:
         return {"ok": False, "message": "No valid fields to update."}
 
-    set_clause = ", ".join(f"{col} = ?" for col in updates.keys())
-    values: List[Any] = list(updates.values())
-    values.append(datetime.utcnow().isoformat())
+    values: List[Any] = [data[col] for col in columns]
     values.append(customer_id)
 
-    with _connect() as conn:
-        cur = conn.execute(
-            f"""
-            UPDATE customers
-            SET {set_clause}, updated_at = ?
-            WHERE id = ?
-            """,
-            values,
-        )
-        conn.commit()
+    async with _write_db() as conn:
+        async with conn.execute(_UPDATE_TEMPLATES[columns], values) as cur:
+            row = await cur.fetchone()
 
-        if cur.rowcount == 0:
-            return {"ok": False, "message": f"Customer {customer_id} not found."}
-
-        row = conn.execute(
-            "SELECT * FROM customers WHERE id = ?",
-            (customer_id,),
-        ).fetchone()
+    if row is None:
+        return {"ok": False, "message": f"Customer {customer_id} not found."}
 
-    return {"ok": True, "customer": _row_to_dict(row)}
+    return {"ok": True, "customer": dict(row)}
 
 
 @mcp.tool()
-def create_ticket(customer_id: int, issue: str, priority: str = "medium") -> Dict[str, Any]:
+@_invalidating_write
+async def create_ticket(customer_id: int, issue: str, priority: str = "medium") -> Dict[str, Any]:
     """Create a new ticket for the customer."""
     if priority not in {"low", "medium", "high"}:
         return {"ok": False, "message": f"Invalid priority: {priority}"}
 
-    now = datetime.utcnow().isoformat()
+    now = _now_iso()
 
-    with _connect() as conn:
-        exists = conn.execute(
-            "SELECT 1 FROM customers WHERE id = ?",
-            (customer_id,),
-        ).fetchone()
-        if exists is None:
-            return {"ok": False, "message": f"Customer {customer_id} not found."}
+    # Inserts nothing (and returns no row) when the customer does not exist
+    async with _write_db() as conn:
+        async with conn.execute(
+            """
+            INSERT INTO tickets (customer_id, issue, status, priority, created_at)
+            SELECT ?, ?, 'open', ?, ?
+            WHERE EXISTS (SELECT 1 FROM customers WHERE id = ?)
+            RETURNING *
+            """,
+            (customer_id, issue, priority, now, customer_id),
+        ) as cur:
+            row = await cur.fetchone()
+
+    if row is None:
+        return {"ok": False, "message": f"Customer {customer_id} not found."}
+
+    return {"ok": True, "ticket": dict(row)}
 
-        cur = conn.execute(
+
+class TicketRequest(BaseModel):
+    """One ticket for create_tickets."""
+
+    customer_id: int
+    issue: str = Field(min_length=1)
+    priority: Literal["low", "medium", "high"] = "medium"
+
+
+# FastMCP validates tool arguments itself; in-process callers (the Data agent)
+# may still pass plain dicts, so create_tickets validates them the same way.
+_TICKET_REQUESTS = TypeAdapter(List[TicketRequest])
+
+
+@mcp.tool()
+@_invalidating_write
+async def create_tickets(tickets: List[TicketRequest]) -> Dict[str, Any]:
+    """Create several tickets in one transaction.
+
+    Each item needs customer_id and issue; priority defaults to medium.
+    """
+    if not tickets:
+        return {"ok": False, "message": "No tickets to create."}
+
+    try:
+        items = _TICKET_REQUESTS.validate_python(tickets)
+    except ValidationError as e:
+        problems = "; ".join(
+            f"{'.'.join(str(part) for part in err['loc'])}: {err['msg']}" for err in e.errors()
+        )
+        return {"ok": False, "message": f"Invalid tickets: {problems}"}
+
+    rows = [(t.customer_id, t.issue, t.priority) for t in items]
+
+    now = _now_iso()
+    customer_ids = list(dict.fromkeys(r[0] for r in rows))
+    placeholders = ", ".join("?" for _ in customer_ids)
+
+    async with _write_db() as conn:
+        # Take the write lock up front so the new ticket IDs are contiguous
+        await conn.execute("BEGIN IMMEDIATE")
+        async with conn.execute(
+            f"SELECT id FROM customers WHERE id IN ({placeholders})",
+            customer_ids,
+        ) as cur:
+            found = {r["id"] for r in await cur.fetchall()}
+        missing = [c for c in customer_ids if c not in found]
+        if missing:
+            await conn.rollback()
+            return {"ok": False, "message": f"Customers not found: {missing}"}
+
+        await conn.executemany(
             """
             INSERT INTO tickets (customer_id, issue, status, priority, created_at)
             VALUES (?, ?, 'open', ?, ?)
             """,
-            (customer_id, issue, priority, now),
+            [(customer_id, issue, priority, now) for customer_id, issue, priority in rows],
         )
-        ticket_id = cur.lastrowid
-        conn.commit()
+        async with conn.execute("SELECT last_insert_rowid()") as cur:
+            last_id = (await cur.fetchone())[0]
+        await conn.commit()
 
-        row = conn.execute(
-            "SELECT * FROM tickets WHERE id = ?",
-            (ticket_id,),
-        ).fetchone()
+        async with conn.execute(
+            "SELECT * FROM tickets WHERE id BETWEEN ? AND ? ORDER BY id",
+            (last_id - len(rows) + 1, last_id),
+        ) as cur:
+            created = await _fetch_dicts(cur)
 
-    return {"ok": True, "ticket": _row_to_dict(row)}
+    return {"ok": True, "count": len(created), "tickets": created}
 
 
 @mcp.tool()
-def get_customer_history(customer_id: int) -> Dict[str, Any]:
+@_cached_read
+async def get_customer_history(customer_id: int) -> Dict[str, Any]:
     """Return customer profile + ticket history."""
-    with _connect() as conn:
-        cust = conn.execute(
-            "SELECT * FROM customers WHERE id = ?",
-            (customer_id,),
-        ).fetchone()
-        if cust is None:
-            return {"found": False, "customer": None, "tickets": []}
-
-        rows = conn.execute(
+    # One LEFT JOIN round trip; a customer without tickets yields a single
+    # row whose ticket columns are NULL.
+    customer: Optional[Dict[str, Any]] = None
+    tickets: List[Dict[str, Any]] = []
+    async with _read_db() as conn:
+        async with conn.execute(
             """
-            SELECT * FROM tickets
-            WHERE customer_id = ?
-            ORDER BY created_at DESC
+            SELECT c.id, c.name, c.email, c.phone, c.status, c.created_at, c.updated_at,
+                   t.id AS t_id, t.issue AS t_issue, t.status AS t_status,
+                   t.priority AS t_priority, t.created_at AS t_created_at
+            FROM customers c
+            LEFT JOIN tickets t ON t.customer_id = c.id
+            WHERE c.id = ?
+            ORDER BY t.created_at DESC
             """,
             (customer_id,),
-        ).fetchall()
+        ) as cur:
+            async for r in cur:
+                if customer is None:
+                    customer = {k: r[k] for k in _CUSTOMER_COLUMNS}
+                if r["t_id"] is not None:
+                    tickets.append({
+                        "id": r["t_id"],
+                        "customer_id": r["id"],
+                        "issue": r["t_issue"],
+                        "status": r["t_status"],
+                        "priority": r["t_priority"],
+                        "created_at": r["t_created_at"],
+                    })
+
+    if customer is None:
+        return {"found": False, "customer": None, "tickets": []}
 
     return {
         "found": True,
-        "customer": _row_to_dict(cust),
-        "tickets": [_row_to_dict(r) for r in rows],
+        "customer": customer,
+        "tickets": tickets,
+    }
+
+
+@mcp.tool()
+@_cached_read
+async def get_customer_histories(customer_ids: List[int], ticket_status: Optional[str] = None) -> Dict[str, Any]:
+    """Return profile + ticket history for several customers in one call.
+
+    Pass ticket_status (open/in_progress/resolved) to return only those tickets.
+    """
+    ids = list(dict.fromkeys(customer_ids))
+    if not ids:
+        return {"count": 0, "histories": [], "not_found": []}
+
+    placeholders = ", ".join("?" for _ in ids)
+    async with _read_db() as conn:
+        async with conn.execute(
+            f"SELECT * FROM customers WHERE id IN ({placeholders})",
+            ids,
+        ) as cur:
+            customers = await cur.fetchall()
+        if ticket_status is None:
+            sql = f"""
+                SELECT * FROM tickets
+                WHERE customer_id IN ({placeholders})
+                ORDER BY created_at DESC
+                """
+            params: List[Any] = ids
+        else:
+            # Served by idx_tickets_status_customer
+            sql = f"""
+                SELECT * FROM tickets
+                WHERE status = ? AND customer_id IN ({placeholders})
+                ORDER BY created_at DESC
+                """
+            params = [ticket_status, *ids]
+        async with conn.execute(sql, params) as cur:
+            tickets = await _fetch_dicts(cur)
+
+    tickets_by_customer: Dict[int, List[Dict[str, Any]]] = {}
+    for t in tickets:
+        tickets_by_customer.setdefault(t["customer_id"], []).append(t)
+
+    found = {c["id"]: c for c in customers}
+    histories = [
+        {"customer": dict(found[i]), "tickets": tickets_by_customer.get(i, [])}
+        for i in ids
+        if i in found
+    ]
+    return {
+        "count": len(histories),
+        "histories": histories,
+        "not_found": [i for i in ids if i not in found],
     }
 
 
 if __name__ == "__main__":
-    mcp.run(transport="streamable-http")
+    # uvloop (libuv) is faster at socket I/O than the default loop; POSIX only
+    if sys.platform != "win32":
+        import uvloop
+        uvloop.install()
+
+    try:
+        mcp.run(transport="streamable-http")
+    finally:
+        asyncio.run(close_db())
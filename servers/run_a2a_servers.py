@@ -1,5 +1,6 @@
 """
-Utility script to start all three A2A agent servers:
+Utility script to start all three A2A agent servers (run from the repository
+root with `python -m servers.run_a2a_servers`):
 
 - Router Host Agent
 - Customer Data Agent
@@ -12,6 +13,7 @@ You can also run each agent individually:
 """
 
 # run_a2a_servers.py
+import asyncio
 import os
 import subprocess
 import sys
@@ -19,6 +21,11 @@ import time
 import signal
 from pathlib import Path
 
+import httpx
+from a2a.utils.constants import AGENT_CARD_WELL_KNOWN_PATH
+
+from agents._sockets import DATA_AGENT_SOCKET, SUPPORT_AGENT_SOCKET
+
 # Define the Agent module paths
 AGENT_MODULES = {
     "router": "agents.router_agent",
@@ -26,22 +33,113 @@ AGENT_MODULES = {
     "support": "agents.support_agent",
 }
 
+# Agent base URLs (must match the agents' cards); Data and Support listen on
+# Unix sockets, so their URLs are routed to the socket files.
+AGENT_URLS = {
+    "router": "http://localhost:11000",
+    "data": "http://localhost:11001",
+    "support": "http://localhost:11002",
+}
+AGENT_SOCKETS = {
+    AGENT_URLS["data"]: DATA_AGENT_SOCKET,
+    AGENT_URLS["support"]: SUPPORT_AGENT_SOCKET,
+}
+READY_TIMEOUT = 30.0
+# Just past Gunicorn's 30 s graceful worker timeout
+SHUTDOWN_TIMEOUT = 35.0
+
+# Each agent's stdout/stderr is appended to logs/<module>.log
+LOG_DIR = Path("logs")
+
 def start_agent(name, module_path) -> subprocess.Popen:
     """Start an agent module as a background subprocess."""
-    print(f"Starting {name} agent...")
+    LOG_DIR.mkdir(exist_ok=True)
+    log_path = LOG_DIR / f"{module_path.rsplit('.', 1)[-1]}.log"
+    print(f"Starting {name} agent (log: {log_path})...")
     
     # We use -m to run the module, assuming the files are in the 'agents' directory
     # and contain the 'if __name__ == "__main__":' block for Uvicorn startup.
-    process = subprocess.Popen(
-        [sys.executable, "-m", module_path],
-        stdout=subprocess.PIPE,
-        stderr=subprocess.STDOUT,
-        text=True,
-        # Use a new process group to manage cleanup gracefully
-        preexec_fn=os.setsid 
-    )
+    # Output goes straight to a file: an unread PIPE fills up and blocks the agent.
+    # The child keeps its own copy of the descriptor, so ours is closed right away.
+    with open(log_path, "ab", buffering=0) as log:
+        process = subprocess.Popen(
+            [sys.executable, "-m", module_path],
+            # Unbuffered so agent output reaches the log file as it happens
+            env={**os.environ, "PYTHONUNBUFFERED": "1"},
+            stdout=log,
+            stderr=subprocess.STDOUT,
+            # Use a new process group to manage cleanup gracefully; unlike a
+            # preexec_fn this keeps CPython on its posix_spawn/vfork fast path
+            start_new_session=True,
+        )
     return process
 
+async def wait_ready(urls, deadline: float = READY_TIMEOUT) -> None:
+    """Poll each agent's card URL until it answers 200, with backoff."""
+    pending = set(urls)
+    mounts = {url: httpx.AsyncHTTPTransport(uds=sock) for url, sock in AGENT_SOCKETS.items()}
+    start = time.monotonic()
+    delay = 0.1
+    async with httpx.AsyncClient(mounts=mounts, timeout=1.0) as client:
+        while pending:
+            for url in list(pending):
+                try:
+                    response = await client.get(f"{url}{AGENT_CARD_WELL_KNOWN_PATH}")
+                    response.raise_for_status()
+                    pending.discard(url)
+                except httpx.HTTPError:
+                    pass
+            if not pending:
+                break
+            if time.monotonic() - start > deadline:
+                raise TimeoutError(f"Agents not ready after {deadline:.0f}s: {sorted(pending)}")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 1.0)
+
+def wait_for_exit(processes) -> None:
+    """Block until any agent process exits."""
+    if hasattr(os, "waitid"):
+        # Sleep in the kernel until a child exits; WNOWAIT leaves it for Popen to reap
+        os.waitid(os.P_ALL, 0, os.WEXITED | os.WNOWAIT)
+        return
+
+    # No waitid (e.g. macOS): poll once a second
+    while all(p.poll() is None for p in processes):
+        time.sleep(1)
+
+def stop_agents(processes, timeout: float = SHUTDOWN_TIMEOUT) -> None:
+    """SIGTERM every agent's process group, then SIGKILL any group still alive at the deadline."""
+    # start_new_session made each agent a group leader (pgid == pid). Signal
+    # every group, even one whose Gunicorn master already died: its workers
+    # don't watch their parent and would otherwise be orphaned.
+    for proc in processes:
+        try:
+            os.killpg(proc.pid, signal.SIGTERM)
+        except ProcessLookupError:
+            pass
+
+    deadline = time.monotonic() + timeout
+    for proc in processes:
+        try:
+            proc.wait(timeout=max(0.0, deadline - time.monotonic()))
+        except subprocess.TimeoutExpired:
+            pass
+        # The master may be gone while its workers still hold the group
+        while _group_alive(proc.pid) and time.monotonic() < deadline:
+            time.sleep(0.1)
+        try:
+            os.killpg(proc.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+        proc.wait()
+
+def _group_alive(pgid: int) -> bool:
+    try:
+        os.killpg(pgid, 0)
+    except ProcessLookupError:
+        return False
+    return True
+
 def main():
     processes = []
     
@@ -55,33 +153,28 @@ def main():
     router_proc = start_agent("Router Host", AGENT_MODULES["router"])
     processes.append(router_proc)
     
-    # 2. Wait for a moment to ensure agents have time to boot and bind ports
-    print("Waiting 10 seconds for servers to initialize...")
-    time.sleep(10)
-    
-    print("\n All agents running in background.")
-    print("   Run 'python run_scenarios.py' in a separate terminal to test.")
-    print("   Press Ctrl+C to stop all servers.")
-    
-    # 3. Keep the main process alive to prevent subprocesses from being killed
     try:
-        while True:
-            time.sleep(1)
-            # Check if any agent crashed
-            if any(p.poll() is not None for p in processes):
-                print("\nError: One or more agent processes crashed unexpectedly!")
-                break
-                
+        # 2. Wait until every agent serves its agent card
+        print("Waiting for agents to become ready...")
+        asyncio.run(wait_ready(AGENT_URLS.values()))
+        
+        print("\n All agents running in background.")
+        print("   Run 'python run_scenarios.py' in a separate terminal to test.")
+        print("   Press Ctrl+C to stop all servers.")
+        
+        # 3. Keep the main process alive to prevent subprocesses from being killed
+        wait_for_exit(processes)
+        print("\nError: One or more agent processes crashed unexpectedly!")
+
+    except TimeoutError as e:
+        print(f"\nError: {e}")
+
     except KeyboardInterrupt:
         print("\nStopping agents...")
         
     finally:
         # 4. Terminate all subprocesses gracefully
-        for proc in processes:
-            if proc.poll() is None:
-                # Send signal to process group to ensure Uvicorn threads are killed
-                os.killpg(os.getpgid(proc.pid), signal.SIGTERM)
-                proc.wait(timeout=5)
+        stop_agents(processes)
         print("Shutdown complete.")
 
 if __name__ == "__main__":